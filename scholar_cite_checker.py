@@ -1,6 +1,25 @@
 import scholarly
 import smtplib
+import asyncio
+import httpx
+import json
+import queue
+import random
+import requests
+import requests_cache
+import tenacity
 import os
+import re
+import sched
+import signal
+import sqlite3
+import ssl
+import sys
+import threading
+from scholarly._navigator import Navigator
+from scholarly._proxy_generator import MaxTriesExceededException
+import copy
+from email import policy as email_policy
 from email.message import EmailMessage
 import time
 import logging
@@ -14,7 +33,13 @@ load_dotenv()
 AUTHOR_NAME = os.getenv("AUTHOR_NAME", "Albert Einstein") 
 # Option 2: Search by Google Scholar Profile ID (more reliable)
 # Make sure AUTHOR_NAME is None or "" if using AUTHOR_ID
-AUTHOR_ID = os.getenv("AUTHOR_ID", None) 
+AUTHOR_ID = os.getenv("AUTHOR_ID", None)
+# Option 3: Check several profiles at once (comma-separated list of profile IDs).
+# Takes precedence over AUTHOR_ID/AUTHOR_NAME when set.
+AUTHOR_IDS = [aid.strip() for aid in os.getenv("AUTHOR_IDS", "").split(",") if aid.strip()]
+# How many Scholar lookups may be in flight at once. Keep this small:
+# Scholar blocks aggressively when hit with parallel requests.
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", 3))
 
 # Email Configuration
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com") # e.g., smtp.gmail.com for Gmail
@@ -24,191 +49,703 @@ SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 SENDER_PASSWORD = os.getenv("SENDER_PASSWORD") 
 RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL")
 
-# File to store the last known citation count
+# Per-author citation history database (see init_db)
+CITATIONS_DB_FILE = "citations.db"
+# Legacy single-value state file; imported into the database on startup
 LAST_COUNT_FILE = "last_citation_count.txt"
 
+# Seconds between checks when running in scheduled mode
+CHECK_INTERVAL_SEC = int(os.getenv("CHECK_INTERVAL_SEC", 3600))
+
+# Increase notifications are queued on disk and flushed as one digest email
+# once the oldest queued event is older than this window, or as soon as a
+# cycle sees no further change (the count has stabilized). 0 means flush at
+# the end of every cycle, i.e. no extra delay beyond coalescing one cycle.
+DIGEST_WINDOW_SEC = int(os.getenv("DIGEST_WINDOW_SEC", 0))
+PENDING_EVENTS_FILE = "pending_events.jsonl"
+
+# Local HTTP cache for Scholar responses (see install_http_cache)
+HTTP_CACHE_FILE = "scholar_cache"
+HTTP_CACHE_EXPIRE_SEC = int(os.getenv("HTTP_CACHE_EXPIRE_SEC", 1800))
+
+# Fast path: fetch profile pages directly with one GET each over a shared
+# HTTP/2 connection, instead of going through scholarly (which costs a
+# search + fill round trip per check over HTTP/1.1). Only applies to lookups
+# by profile ID; name searches always use scholarly.
+USE_FAST_PATH = os.getenv("USE_FAST_PATH", "0") == "1"
+
+# How many times to retry a blocked/failed Scholar fetch before giving up
+FETCH_MAX_ATTEMPTS = int(os.getenv("FETCH_MAX_ATTEMPTS", 5))
+# Hard cap (seconds) on how long one scholarly lookup may block
+SCHOLAR_TIMEOUT_SEC = int(os.getenv("SCHOLAR_TIMEOUT", 30))
+SCHOLAR_PROFILE_URL = "https://scholar.google.com/citations?user={author_id}&hl=en"
+# Total citations is the first gsc_rsb_std cell in the stats table
+_CITEDBY_RE = re.compile(r'<td class="gsc_rsb_std">(\d+)</td>')
+_PROFILE_NAME_RE = re.compile(r'<div id="gsc_prf_in"[^>]*>([^<]+)</div>')
+
+# Ordinary desktop user agents for the fast-path client; picked at random per
+# cycle so the checker doesn't announce itself as python-httpx
+_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+]
+
+def random_ua():
+    """Returns a plausible desktop User-Agent string."""
+    return random.choice(_USER_AGENTS)
+
 # --- Logging Setup ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+# Module-level logger: skips the root-logger lookup on every call, and the
+# %s-style call convention defers message formatting until the level is
+# known to be enabled (cron/systemd deployments often run at WARNING).
+logger = logging.getLogger(__name__)
 
 # --- Functions ---
 
-def read_last_count(filepath):
-    """Reads the last citation count from the specified file."""
+def install_http_cache():
+    """Routes scholarly's HTTP traffic through a requests-cache session.
+
+    Every cycle scholarly re-downloads the full profile HTML even when nothing
+    changed. A CachedSession with Cache-Control/ETag-aware revalidation serves
+    unchanged pages from the local cache (a 304 revalidation is a few hundred
+    bytes vs ~150KB of profile HTML), cutting both bandwidth and the request
+    volume that drives Scholar's CAPTCHA blocking. stale_if_error keeps the
+    last good response usable when Scholar returns an error.
+
+    The cache lasts until scholarly replaces its sessions: use_proxy() and
+    the 403 recovery path both build fresh sessions via _new_session(), so
+    once proxy rotation (_rotate_proxy) fires, the remainder of the process
+    runs uncached.
+    """
     try:
-        with open(filepath, 'r') as f:
-            content = f.read().strip()
+        session = requests_cache.CachedSession(
+            HTTP_CACHE_FILE,
+            expire_after=HTTP_CACHE_EXPIRE_SEC,
+            cache_control=True,
+            stale_if_error=True,
+        )
+        # The Navigator singleton holds one session per proxy manager
+        # (searches go through _session1, profile pages through _session2);
+        # private attributes, but stable across scholarly 1.7.x
+        nav = Navigator()
+        # Take over the browser-style headers (fake_useragent UA, accept,
+        # accept-language) from the session being replaced: a CachedSession
+        # with default python-requests headers would trip Scholar's 403 path,
+        # whose recovery builds a fresh session and discards the cache
+        session.headers.update(dict(nav._session1.headers))
+        nav._session1 = session
+        nav._session2 = session
+        logger.info("HTTP cache installed (%s.sqlite, expire_after=%ss)", HTTP_CACHE_FILE, HTTP_CACHE_EXPIRE_SEC)
+    except Exception as e:
+        logger.warning("Could not install HTTP cache, continuing without it: %s", e)
+
+# Citation history database connection, opened by init_db(). The fan-out
+# worker threads save HTTP validators through it, so access is serialized.
+_db = None
+_db_lock = threading.Lock()
+
+def _migrate_legacy_count_files(db):
+    """Imports pre-SQLite last_citation_count*.txt files as baseline history rows.
+
+    Migrated files are renamed to *.migrated rather than deleted, so existing
+    deployments keep their last count (and don't fire a bogus first-run email)
+    while leaving a breadcrumb in case something goes wrong.
+    """
+    legacy = []
+    for entry in os.listdir('.'):
+        if entry.startswith("last_citation_count_") and entry.endswith(".txt"):
+            legacy.append((entry, entry[len("last_citation_count_"):-len(".txt")]))
+    if os.path.exists(LAST_COUNT_FILE):
+        # The single-author file belongs to whichever author is configured
+        legacy_key = AUTHOR_ID or AUTHOR_NAME
+        if legacy_key:
+            legacy.append((LAST_COUNT_FILE, legacy_key))
+
+    for path, author_key in legacy:
+        try:
+            with open(path, 'r') as f:
+                content = f.read().strip()
             if content:
-                return int(content)
-            else:
-                logging.info(f"File {filepath} is empty, assuming initial count is 0.")
-                return 0 # Assume 0 if file is empty
-    except FileNotFoundError:
-        logging.info(f"File {filepath} not found, assuming initial count is 0.")
-        return 0 # Assume 0 if file doesn't exist
-    except ValueError:
-        logging.error(f"Could not parse integer from {filepath}. Assuming 0.")
-        return 0 # Handle case where file content is not a number
+                db.execute(
+                    'INSERT OR REPLACE INTO history (author_id, ts, citations) VALUES (?, ?, ?)',
+                    (author_key, int(os.path.getmtime(path)), int(content)),
+                )
+            os.replace(path, path + '.migrated')
+            logger.info("Migrated %s into %s", path, CITATIONS_DB_FILE)
+        except Exception as e:
+            logger.error("Could not migrate %s: %s", path, e)
+
+def init_db(db_path=CITATIONS_DB_FILE):
+    """Opens the citation history database, creating the schema on first run.
+
+    One row per observation keyed on (author_id, ts), so the database doubles
+    as a per-author citation journal for trend queries, not just a single
+    latest value. WAL journal mode keeps commits cheap (~100us) and
+    crash-safe. isolation_level=None autocommits each INSERT, matching the
+    one-write-per-observation access pattern.
+    """
+    global _db
+    _db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    _db.execute('PRAGMA journal_mode=WAL')
+    _db.execute(
+        'CREATE TABLE IF NOT EXISTS history ('
+        ' author_id TEXT NOT NULL,'
+        ' ts INTEGER NOT NULL,'
+        ' citations INTEGER NOT NULL,'
+        ' PRIMARY KEY (author_id, ts)'
+        ')'
+    )
+    # Cached HTTP validators (and the name parsed from the last full fetch)
+    # for each profile page, used for conditional GETs on the fast path
+    _db.execute(
+        'CREATE TABLE IF NOT EXISTS http_validators ('
+        ' author_id TEXT PRIMARY KEY,'
+        ' last_modified TEXT,'
+        ' etag TEXT,'
+        ' author_name TEXT'
+        ')'
+    )
+    _migrate_legacy_count_files(_db)
+    return _db
+
+def _get_db():
+    """Returns the shared history connection, opening it on first use."""
+    if _db is None:
+        return init_db()
+    return _db
+
+def read_last_count(author_key):
+    """Returns the most recent recorded citation count for an author (0 if none)."""
+    try:
+        with _db_lock:
+            row = _get_db().execute(
+                'SELECT citations FROM history WHERE author_id = ? ORDER BY ts DESC LIMIT 1',
+                (author_key,),
+            ).fetchone()
     except Exception as e:
-        logging.error(f"Error reading {filepath}: {e}. Assuming 0.")
+        logger.error("Error reading history for %s: %s. Assuming 0.", author_key, e)
         return 0
+    if row is None:
+        logger.info("No history for %s yet, assuming initial count is 0.", author_key)
+        return 0
+    return row[0]
+
+def record_count(author_key, count):
+    """Appends one observation to the author's citation history."""
+    try:
+        with _db_lock:
+            _get_db().execute(
+                'INSERT OR REPLACE INTO history (author_id, ts, citations) VALUES (?, ?, ?)',
+                (author_key, int(time.time()), count),
+            )
+        logger.info("Recorded count %s for %s in %s", count, author_key, CITATIONS_DB_FILE)
+    except Exception as e:
+        logger.error("Error recording count for %s: %s", author_key, e)
+
+def _get_validators(author_id):
+    """Returns the saved (last_modified, etag, author_name) for a profile page."""
+    try:
+        with _db_lock:
+            row = _get_db().execute(
+                'SELECT last_modified, etag, author_name FROM http_validators WHERE author_id = ?',
+                (author_id,),
+            ).fetchone()
+    except Exception as e:
+        logger.error("Error reading HTTP validators for %s: %s", author_id, e)
+        return None, None, None
+    return row if row is not None else (None, None, None)
+
+def _save_validators(author_id, response, author_name):
+    """Saves a response's cache validators for the next conditional GET."""
+    last_modified = response.headers.get('Last-Modified')
+    etag = response.headers.get('ETag')
+    if not last_modified and not etag:
+        return # Scholar gave us nothing to revalidate against
+    try:
+        with _db_lock:
+            _get_db().execute(
+                'INSERT OR REPLACE INTO http_validators (author_id, last_modified, etag, author_name) VALUES (?, ?, ?, ?)',
+                (author_id, last_modified, etag, author_name),
+            )
+    except Exception as e:
+        logger.error("Error saving HTTP validators for %s: %s", author_id, e)
+
+def queue_event(event):
+    """Appends one increase event to the on-disk digest queue.
+
+    The queue is an append-only JSONL file, fsync'd per append, so an increase
+    recorded just before a crash is still emailed by the next run. Returns
+    True once the event is durably on disk.
+    """
+    try:
+        with open(PENDING_EVENTS_FILE, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+    except Exception as e:
+        logger.error("Error appending to %s: %s", PENDING_EVENTS_FILE, e)
+        return False
 
-def write_last_count(filepath, count):
-    """Writes the current citation count to the specified file."""
+def read_pending_events():
+    """Returns all queued increase events (oldest first), skipping corrupt lines."""
+    events = []
+    try:
+        with open(PENDING_EVENTS_FILE, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    logger.error("Skipping corrupt line in %s: %s", PENDING_EVENTS_FILE, line)
+    except FileNotFoundError:
+        pass # No pending events
+    except Exception as e:
+        logger.error("Error reading %s: %s", PENDING_EVENTS_FILE, e)
+    return events
+
+def clear_pending_events():
+    """Empties the digest queue after its events have been emailed."""
+    try:
+        os.remove(PENDING_EVENTS_FILE)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error("Error clearing %s: %s", PENDING_EVENTS_FILE, e)
+
+def render_digest(events):
+    """Formats queued increase events into one email subject and body."""
+    total_increase = sum(e['increase'] for e in events)
+    if len(events) == 1:
+        subject = f"Citation Increase for {events[0]['author']} (+{events[0]['increase']})"
+    else:
+        subject = f"Citation Digest (+{total_increase} across {len(events)} updates)"
+
+    sections = []
+    for e in events:
+        section = f"Author Searched: {e['search_identifier']}\n"
+        section += f"Author Found: {e['author']}\n"
+        section += f"New Total Citations: {e['total']} (previously {e['previous']}, increase of {e['increase']})\n"
+        section += f"Detected on: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e['ts']))}"
+        sections.append(section)
+    return subject, "\n\n".join(sections)
+
+async def fetch_citedby_direct(author_id, client):
+    """Fetches an author's name and total citation count with a single profile GET.
+
+    The scholarly path costs two Scholar round trips (search + fill) and parses
+    the whole profile page into a rich Author dict just to read one field.
+    Fetching the profile HTML directly and pulling the first stats-table cell
+    with a compiled regex halves the request count per check (the main
+    CAPTCHA-risk driver) and skips HTML tree construction entirely.
+
+    When validators from a previous response are on record, the request goes
+    out as a conditional GET (If-Modified-Since / If-None-Match, RFC 7232);
+    a 304 reply has an empty body, so both the download and the parse are
+    skipped and the recorded count is returned as-is. Scholar only sometimes
+    sends validators, so this is opportunistic.
+
+    The client is the cycle's shared HTTP/2 AsyncClient, so concurrent
+    fetches multiplex over one TLS connection. Returns (author_name,
+    citations); raises on HTTP or parse errors so the caller can fall back
+    to the scholarly path.
+    """
+    url = SCHOLAR_PROFILE_URL.format(author_id=author_id)
+
+    headers = {}
+    last_modified, etag, saved_name = _get_validators(author_id)
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    if etag:
+        headers['If-None-Match'] = etag
+
+    response = await client.get(url, headers=headers)
+    if response.status_code == 304:
+        cached_count = read_last_count(author_id)
+        if cached_count:
+            logger.info("Profile for ID %s not modified (304). Reusing recorded count.", author_id)
+            return saved_name or "N/A", cached_count
+        # Nothing recorded to fall back on; refetch unconditionally
+        response = await client.get(url)
+    response.raise_for_status()
+    html = response.text
+
+    match = _CITEDBY_RE.search(html)
+    if not match:
+        raise ValueError(f"Citation stats table not found in profile page for ID {author_id}")
+    citations = int(match.group(1))
+
+    name_match = _PROFILE_NAME_RE.search(html)
+    author_name = name_match.group(1).strip() if name_match else "N/A"
+    _save_validators(author_id, response, author_name)
+    return author_name, citations
+
+def _rotate_proxy(retry_state):
+    """Switches scholarly to a fresh free proxy before the next retry attempt.
+
+    use_proxy() builds fresh sessions inside scholarly, which replaces the
+    cached sessions from install_http_cache(): once rotation fires, the rest
+    of the process runs uncached. Acceptable trade -- rotation only happens
+    when Scholar is already refusing us, and getting unblocked beats caching.
+    """
+    logger.warning("Scholar fetch attempt %s failed: %s. Rotating proxy before retrying.", retry_state.attempt_number, retry_state.outcome.exception())
     try:
-        with open(filepath, 'w') as f:
-            f.write(str(count))
-        logging.info(f"Successfully updated {filepath} with count: {count}")
+        pg = scholarly.ProxyGenerator()
+        if pg.FreeProxies():
+            scholarly.scholarly.use_proxy(pg)
+            logger.info("Switched to a new free proxy.")
+        else:
+            logger.warning("No working free proxy found; retrying without one.")
     except Exception as e:
-        logging.error(f"Error writing to {filepath}: {e}")
+        logger.warning("Proxy rotation failed: %s", e)
+
+@tenacity.retry(
+    retry=tenacity.retry_if_exception_type((MaxTriesExceededException, requests.exceptions.RequestException)),
+    wait=tenacity.wait_exponential_jitter(initial=30, max=600),
+    stop=tenacity.stop_after_attempt(FETCH_MAX_ATTEMPTS),
+    before_sleep=_rotate_proxy,
+    reraise=True,
+)
+def _fetch_author_info(author_name=None, author_id=None):
+    """Runs the scholarly lookup with backoff-and-retry instead of failing for the whole cycle.
+
+    A CAPTCHA block used to kill the check until the next interval. Now a
+    blocked or failed fetch is retried up to FETCH_MAX_ATTEMPTS times with
+    exponential backoff (30s..10min, jittered), rotating to a fresh free
+    proxy between attempts. A small random pre-fetch delay keeps the checks
+    from hitting Scholar in a perfectly regular pattern.
+
+    The lookup itself runs under a hard SCHOLAR_TIMEOUT_SEC cap: scholarly
+    can block for minutes when its proxy stalls, and a hung lookup would
+    otherwise hold up the whole cycle. The worker is a plain daemon thread
+    (not a ThreadPoolExecutor, whose non-daemon workers are joined by an
+    atexit hook and would stall interpreter exit -- fatal for --once runs
+    under cron), so a hung lookup can't outlive the process either. A
+    timeout raises TimeoutError, which is deliberately not retried (each
+    retry could hang for the full budget again); the author is skipped
+    until the next interval instead.
+    """
+    time.sleep(random.uniform(8, 15))
+
+    result_queue = queue.Queue(maxsize=1)
+
+    def lookup():
+        try:
+            if author_id:
+                author_info = scholarly.scholarly.search_author_id(author_id)
+            else:
+                author_info = next(scholarly.scholarly.search_author(author_name)) # Get the first result
+            # Need to fill the author object to get citation count
+            result_queue.put((True, scholarly.scholarly.fill(author_info, sections=['basics'])))
+        except BaseException as e:
+            result_queue.put((False, e))
+
+    worker = threading.Thread(target=lookup, daemon=True, name="scholar-lookup")
+    worker.start()
+    try:
+        ok, outcome = result_queue.get(timeout=SCHOLAR_TIMEOUT_SEC)
+    except queue.Empty:
+        raise TimeoutError(f"Scholar lookup exceeded {SCHOLAR_TIMEOUT_SEC}s")
+    if ok:
+        return outcome
+    raise outcome
 
 def get_citation_count(author_name=None, author_id=None):
     """Fetches the total citation count for a given author from Google Scholar."""
     if not author_name and not author_id:
-        logging.error("Either author_name or author_id must be provided.")
+        logger.error("Either author_name or author_id must be provided.")
         return None, None
 
-    # Configure scholarly to use a free proxy provider if needed to avoid blocks
-    # pg = scholarly.ProxyGenerator()
-    # success = pg.FreeProxies() # Or use other proxy types like ScraperAPI, Luminati etc.
-    # scholarly.scholarly.use_proxy(pg)
-    
     author_info = None
     citations = None
-    search_query = None
+    search_query = f"ID: {author_id}" if author_id else f"Name: {author_name}" # For logging/email subject
 
     try:
         if author_id:
-            logging.info(f"Searching for author by ID: {author_id}")
-            author_info = scholarly.scholarly.search_author_id(author_id)
-            # Need to fill the author object to get citation count
-            author_info = scholarly.scholarly.fill(author_info, sections=['basics'])
-            search_query = f"ID: {author_id}" # For logging/email subject
+            logger.info("Searching for author by ID: %s", author_id)
+            author_info = _fetch_author_info(author_id=author_id)
         elif author_name:
-            logging.info(f"Searching for author by name: {author_name}")
-            search_query = scholarly.scholarly.search_author(author_name)
-            author_info = next(search_query) # Get the first result
-            # Fill the author object to get citation count
-            author_info = scholarly.scholarly.fill(author_info, sections=['basics'])
-            search_query = f"Name: {author_name}" # For logging/email subject
+            logger.info("Searching for author by name: %s", author_name)
+            author_info = _fetch_author_info(author_name=author_name)
 
         if author_info and 'citedby' in author_info:
             citations = author_info['citedby']
-            logging.info(f"Found author: {author_info.get('name', 'N/A')}, Citations: {citations}")
+            logger.info("Found author: %s, Citations: %s", author_info.get('name', 'N/A'), citations)
             return author_info.get('name', 'N/A'), citations
         else:
-             logging.warning(f"Could not find citation info for the author.")
+             logger.warning("Could not find citation info for the author.")
              return author_info.get('name', 'N/A') if author_info else "Unknown Author", None
 
     except StopIteration:
-        logging.error(f"Author '{author_name}' not found.")
+        logger.error("Author '%s' not found.", author_name)
         return author_name, None
     except Exception as e:
-        logging.error(f"An error occurred while fetching citation data: {e}")
-        # Consider adding retries with delay here
+        logger.error("An error occurred while fetching citation data: %s", e)
         return search_query, None
 
 
-def send_email(subject, body, sender, password, receiver, server, port):
-    """Sends an email using SMTP."""
-    if not all([sender, password, receiver, server, port]):
-        logging.error("Email configuration is incomplete. Cannot send email.")
-        return False
-        
-    msg = EmailMessage()
+async def get_citation_count_async(author_name=None, author_id=None):
+    """Async wrapper around get_citation_count; the blocking scholarly calls run in a worker thread."""
+    return await asyncio.to_thread(get_citation_count, author_name, author_id)
+
+async def check_authors(authors):
+    """Fetches citation counts for a list of (author_name, author_id) pairs concurrently.
+
+    Lookups overlap their network latency via asyncio.gather, but a bounded
+    semaphore keeps at most MAX_CONCURRENCY requests in flight so Google
+    Scholar's rate limiting isn't tripped. Returns one result (or exception)
+    per author, in input order.
+
+    With USE_FAST_PATH=1, ID lookups go through one shared HTTP/2 client:
+    every profile fetch in the cycle multiplexes over a single keep-alive TLS
+    connection, so batching N authors costs one handshake instead of N (and
+    less TCP churn for Scholar's bot detection to key on). Any fast-path
+    failure falls back to the scholarly path for that author.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    client = None
+    if USE_FAST_PATH and any(aid for _, aid in authors):
+        try:
+            client = httpx.AsyncClient(
+                http2=True,
+                timeout=30,
+                limits=httpx.Limits(max_keepalive_connections=5),
+                headers={'User-Agent': random_ua()},
+            )
+        except Exception as e:
+            logger.warning("Could not create HTTP/2 client (%s). Using the scholarly path.", e)
+
+    async def check_one(author_name, author_id):
+        async with sem:
+            if client is not None and author_id:
+                try:
+                    name, citations = await fetch_citedby_direct(author_id, client)
+                    logger.info("Found author (fast path): %s, Citations: %s", name, citations)
+                    return name, citations
+                except Exception as e:
+                    logger.warning("Fast path failed for ID %s (%s). Falling back to scholarly.", author_id, e)
+            return await get_citation_count_async(author_name, author_id)
+
+    try:
+        return await asyncio.gather(
+            *(check_one(name, aid) for name, aid in authors),
+            return_exceptions=True,
+        )
+    finally:
+        if client is not None:
+            await client.aclose()
+
+# Shared TLS context: creating one loads the CA bundle from disk, so build it
+# once at import instead of per connection
+_SSL_CONTEXT = ssl.create_default_context()
+
+# Message template built once at import: the constant From header is parsed
+# and validated a single time, and the SMTP policy serializes faster than the
+# compat32 default. Per-send construction is then a copy plus the headers
+# that actually vary.
+_MSG_TEMPLATE = EmailMessage(policy=email_policy.SMTP)
+if SENDER_EMAIL:
+    _MSG_TEMPLATE['From'] = SENDER_EMAIL
+
+def _message_from_template(subject, sender, receiver, body):
+    """Builds one notification message from the shared template.
+
+    A bare copy.copy would share the template's header list, so mutating the
+    copy would pollute the template for every later send; the copy gets its
+    own list before the per-message headers go in.
+    """
+    msg = copy.copy(_MSG_TEMPLATE)
+    msg._headers = list(_MSG_TEMPLATE._headers)
+    if 'From' not in msg:
+        msg['From'] = sender # Template had no SENDER_EMAIL at import time
     msg['Subject'] = subject
-    msg['From'] = sender
     msg['To'] = receiver
     msg.set_content(body)
-
-    try:
-        logging.info(f"Connecting to SMTP server {server}:{port}")
-        with smtplib.SMTP(server, port) as smtp_server:
-            smtp_server.starttls() # Enable security
-            logging.info("Logging into SMTP server...")
-            smtp_server.login(sender, password)
-            logging.info(f"Sending email to {receiver}...")
-            smtp_server.send_message(msg)
-            logging.info("Email sent successfully.")
-            return True
-    except smtplib.SMTPAuthenticationError:
-        logging.error("SMTP Authentication Error: Check sender email/password (or App Password for Gmail).")
-        return False
-    except Exception as e:
-        logging.error(f"Failed to send email: {e}")
+    return msg
+
+class SMTPNotifier:
+    """Context manager holding one SMTP connection open for a batch of emails.
+
+    Connecting, upgrading to TLS and authenticating costs several network
+    round trips per email; doing it once per check cycle instead of once per
+    message amortizes that setup across every notification the cycle sends.
+    """
+
+    def __init__(self, sender, password, server, port):
+        self.sender = sender
+        self.password = password
+        self.server = server
+        self.port = port
+        self.smtp = None
+
+    def __enter__(self):
+        logger.info("Connecting to SMTP server %s:%s", self.server, self.port)
+        if self.port == 465:
+            # Implicit TLS (SMTPS): encrypted from the first byte, which skips
+            # the plain EHLO -> STARTTLS -> EHLO upgrade round trip
+            self.smtp = smtplib.SMTP_SSL(self.server, self.port, context=_SSL_CONTEXT)
+        else:
+            self.smtp = smtplib.SMTP(self.server, self.port)
+            self.smtp.starttls(context=_SSL_CONTEXT) # Enable security
+        logger.info("Logging into SMTP server...")
+        self.smtp.login(self.sender, self.password)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                pass # Connection may already be gone; nothing left to clean up
         return False
 
+    def send(self, subject, body, receiver):
+        """Sends one email over the already-open connection."""
+        msg = _message_from_template(subject, self.sender, receiver, body)
+        logger.info("Sending email to %s...", receiver)
+        self.smtp.send_message(msg)
+        logger.info("Email sent successfully.")
+
 # --- Main Execution ---
 
-if __name__ == "__main__":
-    while True:
-        try:
-            logging.info("--- Starting Hourly Citation Check ---")
-
-            # Read the last known citation count
-            last_count = read_last_count(LAST_COUNT_FILE)
-            logging.info(f"Last known citation count: {last_count}")
-
-            # Determine search criteria
-            target_author_name = AUTHOR_NAME
-            target_author_id = AUTHOR_ID
-
-            author_display_name = "N/A"
-            total_citations = None
-            search_identifier = "N/A"
-
-            # Prefer ID if provided
-            if target_author_id:
-                search_identifier = f"ID: {target_author_id}"
-                author_display_name, total_citations = get_citation_count(author_id=target_author_id)
-            elif target_author_name:
-                search_identifier = f"Name: {target_author_name}"
-                author_display_name, total_citations = get_citation_count(author_name=target_author_name)
-            else:
-                logging.error("No author name or ID provided in environment variables. Skipping check for this cycle.")
-                # No need to proceed further in this iteration if no author is specified
-
-            # Only proceed with comparison/email if an author was specified and count retrieved
-            if search_identifier != "N/A":
-                if total_citations is not None:
-                    # Compare with the last known count
-                    if total_citations > last_count:
-                        logging.info(f"New citation count ({total_citations}) is higher than the last count ({last_count}). Sending email.")
-
-                        increase = total_citations - last_count
-                        subject = f"Citation Increase for {author_display_name} (+{increase})"
-                        body = f"Author Searched: {search_identifier}\n"
-                        body += f"Author Found: {author_display_name}\n"
-                        body += f"New Total Citations: {total_citations} (previously {last_count}, increase of {increase})\n\n"
-                        body += f"Checked on: {time.strftime('%Y-%m-%d %H:%M:%S')}"
-
-                        email_sent = send_email(subject, body, SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL, SMTP_SERVER, SMTP_PORT)
-
-                        # Update the count file only if the email was sent successfully
-                        if email_sent:
-                            write_last_count(LAST_COUNT_FILE, total_citations)
-                        else:
-                             logging.error("Email failed to send. Last count file will not be updated.")
-
-                    elif total_citations == last_count:
-                        logging.info(f"Citation count ({total_citations}) has not changed since the last check.")
-                    else:
-                        # This case (count decreasing) is unlikely but possible if corrections occur on Scholar
-                        logging.warning(f"Citation count ({total_citations}) is lower than the last known count ({last_count}). Not sending email, but updating count file.")
-                        write_last_count(LAST_COUNT_FILE, total_citations) # Update to the lower count
+def run_once():
+    """Runs a single citation check cycle: fetch, compare, notify, persist."""
+    try:
+        logger.info("--- Starting Citation Check ---")
+
+        # Determine the set of authors to check: (search_identifier, name, id, history key)
+        targets = []
+        if AUTHOR_IDS:
+            for aid in AUTHOR_IDS:
+                targets.append((f"ID: {aid}", None, aid, aid))
+        elif AUTHOR_ID:
+            targets.append((f"ID: {AUTHOR_ID}", None, AUTHOR_ID, AUTHOR_ID))
+        elif AUTHOR_NAME:
+            targets.append((f"Name: {AUTHOR_NAME}", AUTHOR_NAME, None, AUTHOR_NAME))
+        else:
+            logger.error("No author name or ID provided in environment variables. Skipping check for this cycle.")
+            return
+
+        # Fan out the Scholar lookups concurrently (bounded by MAX_CONCURRENCY)
+        results = asyncio.run(check_authors([(name, aid) for _, name, aid, _ in targets]))
+
+        # Whether this cycle detected any new increase (used for digest flushing)
+        increase_this_cycle = False
+
+        for (search_identifier, _, _, author_key), result in zip(targets, results):
+            if isinstance(result, BaseException):
+                logger.error("Check failed for %s: %s", search_identifier, result)
+                continue
+
+            author_display_name, total_citations = result
+
+            if total_citations is None:
+                # This case handles when get_citation_count fails for the specified author
+                logger.warning("Could not retrieve citation count for %s. No comparison or email sent this cycle.", search_identifier)
+                continue
+
+            # Read the last known citation count for this author
+            last_count = read_last_count(author_key)
+            logger.info("Last known citation count for %s: %s", search_identifier, last_count)
+
+            # Compare with the last known count
+            if total_citations > last_count:
+                logger.info("New citation count (%s) is higher than the last count (%s). Queueing notification.", total_citations, last_count)
+
+                increase_this_cycle = True
+                event = {
+                    'ts': int(time.time()),
+                    'search_identifier': search_identifier,
+                    'author': author_display_name,
+                    'previous': last_count,
+                    'total': total_citations,
+                    'increase': total_citations - last_count,
+                }
+                # Record the new count only once the event is durably queued,
+                # so an unrecorded increase is re-detected next cycle
+                if queue_event(event):
+                    record_count(author_key, total_citations)
+                else:
+                    logger.error("Could not queue notification. Count will not be recorded; the increase will be re-detected next cycle.")
 
+            elif total_citations == last_count:
+                logger.info("Citation count (%s) has not changed since the last check.", total_citations)
+            else:
+                # This case (count decreasing) is unlikely but possible if corrections occur on Scholar
+                logger.warning("Citation count (%s) is lower than the last known count (%s). Not sending email, but recording the new count.", total_citations, last_count)
+                record_count(author_key, total_citations) # Record the lower count
+
+        # Flush the digest queue: send one email covering every queued increase,
+        # either once the oldest event has waited out the digest window or as
+        # soon as a cycle sees no further change (the count has stabilized)
+        events = read_pending_events()
+        if events:
+            oldest_ts = min(e.get('ts', 0) for e in events)
+            window_elapsed = time.time() - oldest_ts >= DIGEST_WINDOW_SEC
+            if window_elapsed or not increase_this_cycle:
+                if not all([SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL, SMTP_SERVER, SMTP_PORT]):
+                    logger.error("Email configuration is incomplete. Cannot send email. Events stay queued.")
                 else:
-                    # This case handles when get_citation_count fails for the specified author
-                    logging.warning(f"Could not retrieve citation count for {search_identifier}. No comparison or email sent this cycle.")
+                    subject, body = render_digest(events)
+                    try:
+                        with SMTPNotifier(SENDER_EMAIL, SENDER_PASSWORD, SMTP_SERVER, SMTP_PORT) as notifier:
+                            notifier.send(subject, body, RECEIVER_EMAIL)
+                        # Clear the queue only once the digest actually went out
+                        clear_pending_events()
+                    except smtplib.SMTPAuthenticationError:
+                        logger.error("SMTP Authentication Error: Check sender email/password (or App Password for Gmail). Events stay queued.")
+                    except Exception as e:
+                        logger.error("Failed to send digest email: %s. Events stay queued for the next cycle.", e)
+            else:
+                logger.info("Holding %s queued event(s) for the digest window (%ss remaining).", len(events), int(DIGEST_WINDOW_SEC - (time.time() - oldest_ts)))
 
-            logging.info("--- Citation Check Cycle Finished ---")
+        logger.info("--- Citation Check Cycle Finished ---")
+
+    except Exception as e:
+        # Catch any unexpected errors during the cycle so a scheduled run can't take the script down
+        logger.error("An unexpected error occurred during the check cycle: %s", e)
+
+
+def _handle_sigterm(signum, frame):
+    # Turn SIGTERM into SystemExit so the scheduler loop can shut down cleanly
+    raise SystemExit(0)
 
-        except Exception as e:
-            # Catch any unexpected errors during the cycle to prevent the whole script crashing
-            logging.error(f"An unexpected error occurred during the check cycle: {e}")
-            logging.error("Script will continue to the next cycle after the delay.")
 
-        # Wait for an hour before the next check
-        logging.info("Waiting for 1 hour before next check...")
-        time.sleep(3600) # 3600 seconds = 1 hour
+def main():
+    """Entry point.
 
-    logging.info("--- Citation Check Finished ---") 
\ No newline at end of file
+    With --once (for cron/systemd-timer deployments) a single check is run and
+    the process exits, so no Python process stays resident between checks.
+    Without it, an in-process sched.scheduler repeats the check every
+    CHECK_INTERVAL_SEC seconds and can be interrupted by SIGTERM/Ctrl+C.
+    """
+    init_db()
+    install_http_cache()
+
+    if "--once" in sys.argv[1:]:
+        run_once()
+        return
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    scheduler = sched.scheduler(time.monotonic, time.sleep)
+
+    def _cycle():
+        run_once()
+        logger.info("Next check in %s seconds...", CHECK_INTERVAL_SEC)
+        scheduler.enter(CHECK_INTERVAL_SEC, 1, _cycle)
+
+    scheduler.enter(0, 1, _cycle)
+    try:
+        scheduler.run()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("--- Citation Checker Stopped ---")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file